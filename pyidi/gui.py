@@ -79,7 +79,7 @@ def gui(self):
             
     # Start gui
     viewer = napari.Viewer(title='pyIDI interface')
-    image_layer = viewer.add_image(self.mraw)
+    image_layer = viewer.add_image(self.mraw, contrast_limits=tuple(np.percentile(self.frame0, [1, 99])))
 
     if not hasattr(self, 'method_name'):
         self.method_name = NO_METHOD
@@ -281,16 +281,13 @@ def view_ROI(self): # view ROI boxes
             v_half_subset = self.method.roi_size[0]/2 #vertical
             h_half_subset = self.method.roi_size[1]/2 #horizontal
 
+        v_offsets = np.array([-v_half_subset, -v_half_subset, v_half_subset, v_half_subset], dtype=np.float32)
+        h_offsets = np.array([-h_half_subset, h_half_subset, h_half_subset, -h_half_subset], dtype=np.float32)
+
+        rectangles = np.empty(shape=(len(self._py), 4, 2), dtype=np.float32)
+        rectangles[:, :, 0] = self._py[:, np.newaxis] + v_offsets
+        rectangles[:, :, 1] = self._px[:, np.newaxis] + h_offsets
 
-        rectangles = np.empty(shape=(len(self.points), 4, 2))
-        for i in range(len(self.points)):
-            rectangle = np.array([[self.points[i,0]-v_half_subset, self.points[i,1]-h_half_subset],
-                                [self.points[i,0]-v_half_subset, self.points[i,1]+h_half_subset],
-                                [self.points[i,0]+v_half_subset, self.points[i,1]+h_half_subset],
-                                [self.points[i,0]+v_half_subset, self.points[i,1]-h_half_subset]])
-                            
-            rectangles[i] = rectangle
-        
         return rectangles
 
 
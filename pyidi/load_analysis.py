@@ -2,6 +2,7 @@ import os
 import json
 import pickle
 import warnings
+import numpy as np
 
 from . import pyidi
 
@@ -27,9 +28,9 @@ def load_analysis(analysis_path, cih_file=None, load_results=True):
     else:
         video = pyidi.pyIDI(cih_file)
     
-    points = pickle.load(open(os.path.join(analysis_path, 'points.pkl'), 'rb'))
+    points = _load_array(analysis_path, 'points')
     if load_results:
-        results = pickle.load(open(os.path.join(analysis_path, 'results.pkl'), 'rb'))
+        results = _load_array(analysis_path, 'results', mmap_mode='r')
         video.displacements = results
 
     video.set_points(points)
@@ -43,3 +44,14 @@ def load_analysis(analysis_path, cih_file=None, load_results=True):
 
     return video, settings['settings']
 
+
+def _load_array(analysis_path, name, mmap_mode=None):
+    """Load the saved array (.npy, or .pkl for older analyses).
+    """
+    filename = os.path.join(analysis_path, name + '.npy')
+    if os.path.exists(filename):
+        return np.load(filename, mmap_mode=mmap_mode)
+    
+    with open(os.path.join(analysis_path, name + '.pkl'), 'rb') as f:
+        return pickle.load(f)
+
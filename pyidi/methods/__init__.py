@@ -2,5 +2,6 @@ from .idi_method import IDIMethod
 from ._simplified_optical_flow import SimplifiedOpticalFlow
 from ._gradient_based_optical_flow import GradientBasedOpticalFlow
 from ._lucas_kanade_scipy import LucasKanadeSc
-from ._lucas_kanade import LucasKanade
-from ._lucas_kanade_scipy2 import LucasKanadeSc2
\ No newline at end of file
+from ._lucas_kanade import LucasKanade, LucasKanadeNB
+from ._lucas_kanade_scipy2 import LucasKanadeSc2
+from ._lucas_kanade_cuda import LucasKanadeCUDA
\ No newline at end of file
@@ -14,7 +14,6 @@ import scipy.optimize
 from skimage.transform import pyramid_gaussian
 
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 from tqdm import tqdm
 from multiprocessing import Pool
 import pickle
@@ -83,7 +82,7 @@ class LucasKanade(IDIMethod):
         :param mraw_range: Part of the video to process. If "full", a full video is processed. If first element of tuple is not 0,
             a appropriate reference image should be chosen.
         :type mraw_range: tuple or "full"
-        :param use_numba: Use numba.njit for computation speedup. Currently not implemented.
+        :param use_numba: Use numba.njit compiled functions in the optimization loop for computation speedup.
         :type use_numba: bool
         :param pyramid_number: pyramidal implementation for lukas-kanade method, defaults to 0 (not using pyramid).
         :type pyramid_number: int
@@ -161,13 +160,18 @@ class LucasKanade(IDIMethod):
         self.N_time_points = len(range(self.start_time-self.step_time, self.stop_time, self.step_time))
 
 
-    def calculate_displacements(self, video, **kwargs):
+    supports_results_file = True
+
+    def calculate_displacements(self, video, results_file=None, **kwargs):
         """
         Calculate displacements for set points and roi size.
 
         kwargs are passed to `configure` method. Pre-set arguments (using configure)
         are NOT changed!
-        
+
+        :param results_file: if given, the displacements are written into this .npy file
+            (memmap) as they are computed, defaults to None
+        :type results_file: str, optional
         """
         # Updating the atributes
         config_kwargs = dict([(var, None) for var in self.configure.__code__.co_varnames])
@@ -191,8 +195,8 @@ class LucasKanade(IDIMethod):
             if not self.resume_analysis:
                 self.create_temp_files(init_multi=True)
             
+            # the results of the processes are joined at the end, `pyIDI.save` writes them
             self.displacements = multi(video, self.processes)
-            # return?
 
         else:
             self.image_size = video.mraw.shape[-2:]
@@ -203,6 +207,9 @@ class LucasKanade(IDIMethod):
                 self.displacements = np.zeros((video.points.shape[0], self.N_time_points, 2))
                 self.create_temp_files(init_multi=False)
 
+            if results_file is not None:
+                self.displacements = results_memmap(results_file, self.displacements)
+
             self.warnings = []
 
             # Precomputables
@@ -221,9 +228,10 @@ class LucasKanade(IDIMethod):
                 print(f'...done in {time.time() - t:.2f} s')
 
             # Time iteration.
+            frames = tools.FramePrefetcher(video.mraw, lookahead=8*self.step_time)
             for ii, i in enumerate(self._pbar_range(self.start_time, self.stop_time, self.step_time)):
                 ii = ii + 1
-                G_current = video.mraw[i,:,:]
+                G_current = frames[i]
                 G_pyramid = self.create_pyramid(G_current)
                 
                 # Iterate over points.
@@ -293,7 +301,12 @@ class LucasKanade(IDIMethod):
         Gx, Gy = tools.get_gradient(G_float)
         G_float_clipped = G_float[1:-1, 1:-1]
 
-        A_inv = compute_inverse_numba(Gx, Gy)
+        if self.use_numba:
+            compute_inverse, compute_delta = compute_inverse_jit, compute_delta_jit
+        else:
+            compute_inverse, compute_delta = compute_inverse_numba, compute_delta_numba
+
+        A_inv = compute_inverse(Gx, Gy)
 
         # initialize values
         error = 1.
@@ -309,7 +322,7 @@ class LucasKanade(IDIMethod):
             x_f += delta[1]
 
             F = F_spline(y_f, x_f)
-            delta, error = compute_delta_numba(F, G_float_clipped, Gx, Gy, A_inv)
+            delta, error = compute_delta(F, G_float_clipped, Gx, Gy, A_inv)
 
             displacement += delta
             if error < tol:
@@ -319,6 +332,23 @@ class LucasKanade(IDIMethod):
         return -displacement
 
 
+    def _compile(self):
+        """
+        Use the numba compiled functions and warm them up for the float64
+        C/A-layout signatures used in `optimize_translations` (numba specializes
+        on the dtype and layout, not on the shape). The compiled functions are
+        cached on disk and reused by later instances.
+        """
+        self.use_numba = True
+        # only the types matter, the results are discarded
+        G = np.ones(np.array(self.roi_size) + 2)
+        Gx, Gy = tools.get_gradient(G)
+        A_inv = compute_inverse_jit(Gx, Gy)
+        # Same array layouts as in `optimize_translations` (F from the spline is C-contiguous)
+        F = np.ascontiguousarray(G[1:-1, 1:-1])
+        compute_delta_jit(F, G[1:-1, 1:-1], Gx, Gy, A_inv)
+
+
     def _padded_slice(self, point, roi_size, image_shape, pad=None):
         '''
         Returns a slice that crops an image around a given `point` center, 
@@ -500,14 +530,12 @@ class LucasKanade(IDIMethod):
         roi_size = self.roi_size
 
         fig, ax = plt.subplots(figsize=figsize)
-        ax.imshow(video.mraw[0].astype(float), cmap=cmap)
+        ax.imshow(video.preview, cmap=cmap, vmin=0, vmax=255)
         ax.scatter(video.points[:, 1],
                    video.points[:, 0], marker='.', color=color)
 
-        for point in video.points:
-            roi_border = patches.Rectangle((point - self.roi_size//2 - 0.5)[::-1], self.roi_size[1], self.roi_size[0],
-                                            linewidth=1, edgecolor=color, facecolor='none')
-            ax.add_patch(roi_border)
+        ax.add_collection(tools.roi_collection(video.points, self.roi_size, offset=-0.5,
+                                               linewidths=1, edgecolors=color, facecolors='none'))
 
         plt.grid(False)
         plt.show()
@@ -745,6 +773,7 @@ def multi(video, processes):
         'resume_analysis': video.method.resume_analysis,
         'reference_image': video.method.reference_image,
         'mraw_range': video.method.mraw_range,
+        'use_numba': video.method.use_numba,
     }
     if video.method.pbar_type == 'atpbar':
         print(f'Computation start: {datetime.datetime.now()}')
@@ -804,7 +833,26 @@ def worker(points, idi_kwargs, method_kwargs, i):
     return _video.get_displacements(verbose=0), i
 
 
-# @nb.njit
+class LucasKanadeNB(LucasKanade):
+    """
+    Translation identification based on the Lucas-Kanade method (see `LucasKanade`),
+    with the optimization loop functions compiled by numba.
+    """
+    def __init__(self, video, *args, **kwargs):
+        kwargs.setdefault('use_numba', True)
+        super().__init__(video, *args, **kwargs)
+
+
+def results_memmap(filename, displacements):
+    """
+    Create a .npy file memmap and fill it with the initial `displacements`.
+    The computed displacements are then written directly into the file.
+    """
+    out = np.lib.format.open_memmap(filename, mode='w+', dtype=displacements.dtype, shape=displacements.shape)
+    out[:] = displacements
+    return out
+
+
 def compute_inverse_numba(Gx, Gy):
     Gx2 = np.sum(Gx**2)
     Gy2 = np.sum(Gy**2)
@@ -814,7 +862,6 @@ def compute_inverse_numba(Gx, Gy):
 
     return A_inv
 
-# @nb.njit
 def compute_delta_numba(F, G, Gx, Gy, A_inv):
     F_G = G - F
     b = np.array([np.sum(Gx*F_G), np.sum(Gy*F_G)])
@@ -823,3 +870,6 @@ def compute_delta_numba(F, G, Gx, Gy, A_inv):
     error = np.sqrt(np.sum(delta**2))
     return delta, error
 
+
+compute_inverse_jit = nb.njit(cache=True, fastmath=True, error_model='numpy')(compute_inverse_numba)
+compute_delta_jit = nb.njit(cache=True, fastmath=True, error_model='numpy')(compute_delta_numba)
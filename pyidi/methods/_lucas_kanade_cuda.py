@@ -0,0 +1,122 @@
+import numpy as np
+import time
+import os
+import shutil
+import warnings
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from ._lucas_kanade import LucasKanade
+
+
+class LucasKanadeCUDA(LucasKanade):
+    """
+    Translation identification based on the pyramidal Lucas-Kanade sparse optical
+    flow, computed on the GPU with OpenCV's CUDA module (`cv2.cuda.SparsePyrLKOpticalFlow`).
+    If OpenCV with CUDA support or a CUDA device is not available, the CPU
+    `LucasKanade` implementation is used.
+    """
+    # The GPU computation does not write into the results file
+    supports_results_file = False
+
+    def calculate_displacements(self, video, **kwargs):
+        """
+        Calculate displacements for set points and roi size on the GPU.
+
+        The settings are the same as with the `LucasKanade` method:
+        `roi_size` is the tracking window, `pyramid_number` the maximum pyramid
+        level and `max_nfev` the number of iterations on each level.
+
+        kwargs are passed to `configure` method. Pre-set arguments (using configure)
+        are NOT changed!
+        """
+        if not cuda_available():
+            warnings.warn('OpenCV with CUDA support is not available. Using the CPU `LucasKanade` implementation.')
+            return super().calculate_displacements(video, **kwargs)
+
+        # Updating the atributes
+        config_kwargs = dict([(var, None) for var in self.configure.__code__.co_varnames])
+        config_kwargs.pop('self', None)
+        config_kwargs.update((k, kwargs[k]) for k in config_kwargs.keys() & kwargs.keys())
+        self.configure(**config_kwargs)
+
+        self.image_size = video.mraw.shape[-2:]
+        self.displacements = np.zeros((video.points.shape[0], self.N_time_points, 2))
+
+        start_time = time.time()
+
+        lk = cv2.cuda.SparsePyrLKOpticalFlow_create(
+            winSize=(int(self.roi_size[1]), int(self.roi_size[0])),
+            maxLevel=int(self.pyramid_number),
+            iters=int(self.max_nfev),
+            useInitialFlow=True
+        )
+
+        # Staging buffer, reused for every frame and page-locked so that `upload` uses DMA
+        host_frame = np.empty(self.image_size, dtype=np.float32)
+        cv2.cuda.registerPageLocked(host_frame)
+        try:
+            # The reference image is uploaded once, the current frame buffer is reused
+            host_frame[:] = self._set_reference_image(video, self.reference_image)
+            gpu_reference = cv2.cuda_GpuMat()
+            gpu_reference.upload(host_frame)
+            gpu_current = cv2.cuda_GpuMat(self.image_size[0], self.image_size[1], cv2.CV_32FC1)
+
+            # OpenCV expects (x, y) points of shape (1, n_points) with 2 channels
+            points_reference = np.ascontiguousarray(video.points[:, ::-1], dtype=np.float32)[np.newaxis]
+            gpu_points_reference = cv2.cuda_GpuMat()
+            gpu_points_reference.upload(points_reference)
+            gpu_points_current = cv2.cuda_GpuMat()
+            gpu_points_current.upload(points_reference)
+
+            self.warnings = []
+            for ii, i in enumerate(self._pbar_range(self.start_time, self.stop_time, self.step_time)):
+                ii = ii + 1
+                host_frame[:] = video.mraw[i]
+                gpu_current.upload(host_frame)
+
+                # Start from the previous optimal positions
+                gpu_points_current, gpu_status, _ = lk.calc(gpu_reference, gpu_current, gpu_points_reference, gpu_points_current)
+                points_current = gpu_points_current.download()
+                lost = gpu_status.download().ravel() == 0
+
+                self.displacements[:, ii, :] = (points_current[0] - points_reference[0])[:, ::-1]
+
+                if np.any(lost):
+                    # The points that were not tracked have no valid displacement
+                    # and are restarted from the reference positions in the next frame.
+                    self.displacements[lost, ii, :] = np.nan
+                    points_current[0, lost] = points_reference[0, lost]
+                    gpu_points_current.upload(points_current)
+                    self.warnings.append(f'Frame {i}: {np.sum(lost)} points were not tracked.')
+        finally:
+            cv2.cuda.unregisterPageLocked(host_frame)
+
+        if self.warnings:
+            warnings.warn(f'The GPU tracker lost points in {len(self.warnings)} frames. ' +
+                'Their displacements are set to NaN (see `method.warnings`).')
+
+        if self.verbose:
+            full_time = time.time() - start_time
+            print(f'Time to complete: {full_time:.1f} s')
+
+
+    def clear_temp_files(self):
+        """Clearing the temporary files (if created by the CPU implementation).
+        """
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+
+def cuda_available():
+    """Check if OpenCV is built with CUDA support and a CUDA device is present.
+    """
+    if cv2 is None or not hasattr(cv2, 'cuda'):
+        return False
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except cv2.error:
+        return False
@@ -5,7 +5,6 @@ import scipy.signal
 from scipy.interpolate import interp2d
 import scipy.optimize
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 from tqdm import tqdm
 from multiprocessing import Pool
 from psutil import cpu_count
@@ -201,15 +200,13 @@ class LucasKanadeSc(IDIMethod):
                 roi_size = self.roi_size
 
         fig, ax = plt.subplots(figsize=(15, 5))
-        ax.imshow(video.mraw[0].astype(float), cmap='gray')
+        ax.imshow(video.preview, cmap='gray', vmin=0, vmax=255)
         ax.scatter(video.points[:, 1],
                    video.points[:, 0], marker='.', color='r')
 
         if roi_size is not None:
-            for point in video.points:
-                roi_border = patches.Rectangle((point - self.roi_size//2)[::-1], self.roi_size[1], self.roi_size[0],
-                                               linewidth=1, edgecolor='r', facecolor='none')
-                ax.add_patch(roi_border)
+            ax.add_collection(tools.roi_collection(video.points, self.roi_size,
+                                                   linewidths=1, edgecolors='r', facecolors='none'))
 
         plt.grid(False)
         plt.show()
@@ -11,7 +11,6 @@ from scipy.linalg import lu_factor, lu_solve
 from scipy.interpolate import RectBivariateSpline
 import scipy.optimize
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 from tqdm import tqdm
 from multiprocessing import Pool
 import pickle
@@ -390,14 +389,12 @@ class LucasKanadeSc2(IDIMethod):
         roi_size = self.roi_size
 
         fig, ax = plt.subplots(figsize=figsize)
-        ax.imshow(video.mraw[0].astype(float), cmap=cmap)
+        ax.imshow(video.preview, cmap=cmap, vmin=0, vmax=255)
         ax.scatter(video.points[:, 1],
                    video.points[:, 0], marker='.', color=color)
 
-        for point in video.points:
-            roi_border = patches.Rectangle((point - self.roi_size//2)[::-1], self.roi_size[1], self.roi_size[0],
-                                            linewidth=1, edgecolor=color, facecolor='none')
-            ax.add_patch(roi_border)
+        ax.add_collection(tools.roi_collection(video.points, self.roi_size,
+                                               linewidths=1, edgecolors=color, facecolors='none'))
 
         plt.grid(False)
         plt.show()
@@ -11,6 +11,7 @@ from matplotlib.figure import Figure
 import warnings
 warnings.simplefilter("default")
 
+from .. import tools
 from .idi_method import IDIMethod
 
 
@@ -68,7 +69,29 @@ class SimplifiedOpticalFlow(IDIMethod):
             self.video.mraw[self.reference_range[0]: self.reference_range[1]], self.subset_size)
 
 
-    def calculate_displacements(self, video):
+    supports_parallel_frames = True
+
+    @property
+    def frame_range(self):
+        """
+        The (start, stop) range of frames that is processed, clamped to the
+        video length as when slicing `mraw`.
+        """
+        if self.mraw_range != 'all':
+            start, stop = slice(*self.mraw_range[:2]).indices(self.video.N)[:2]
+            return (start, max(start, stop))
+        else:
+            return (0, self.video.N)
+
+    def calculate_displacements(self, video, postprocess=True):
+        """
+        Calculate the displacements of set points.
+
+        :param postprocess: average the neighbouring points, shift to zero mean
+            and check for large displacements, defaults to True. Disabled when the
+            frames are split between processes and the parts are postprocessed together.
+        :type postprocess: bool, optional
+        """
         if not hasattr(video, 'points'):
             raise Exception('Please set points for analysis!')
 
@@ -101,7 +124,7 @@ class SimplifiedOpticalFlow(IDIMethod):
             def p_bar(x, **kwargs): return x  # empty function
 
         # calculating the displacements
-        for i, image in enumerate(p_bar(limited_mraw, ncols=100)):
+        for i, image in enumerate(p_bar(tools.FramePrefetcher(limited_mraw), ncols=100)):
             image_filtered = self.subset(image, self.subset_size)
 
             if self.pixel_shift:
@@ -121,6 +144,13 @@ class SimplifiedOpticalFlow(IDIMethod):
             self.displacements[:, i, 1] = signs_1 * self.direction_correction_1 * \
                 self.latest_displacements * self.convert_from_px
 
+        if postprocess:
+            self.postprocess()
+
+    def postprocess(self):
+        """Average the neighbouring points, shift the mean to zero and
+        check for large displacements.
+        """
         # average the neighbouring points
         if isinstance(self.mean_n_neighbours, int):
             if self.mean_n_neighbours > 0:
@@ -140,6 +170,21 @@ class SimplifiedOpticalFlow(IDIMethod):
     def calculate_displacements_multiprocessing(self):
         raise Exception('SimplifiedOpticalFLow method does not contain a multiprocessing option.')
 
+    def create_settings_dict(self):
+        """Make a dictionary of the chosen settings.
+        """
+        INCLUDE_KEYS = [
+            'subset_size',
+            'pixel_shift',
+            'convert_from_px',
+            'mraw_range',
+            'mean_n_neighbours',
+            'zero_shift',
+            'progress_bar',
+            'reference_range',
+        ]
+        return dict([(k, self.__dict__[k]) for k in INCLUDE_KEYS])
+
     def displacement_averaging(self):
         """Calculate the average of displacements.
         """
@@ -4,6 +4,13 @@ import numpy as np
 class IDIMethod:
     """Common functions for all methods.
     """
+    # Set to True if the frames can be processed independently in separate processes.
+    # Such a method must have a `frame_range` (start, stop), accept `mraw_range=(start, stop)`
+    # in `configure` and split `calculate_displacements(video, postprocess=False)` from `postprocess()`.
+    supports_parallel_frames = False
+    # Set to True if `calculate_displacements` accepts `results_file` (the .npy file 
+    # the displacements are written into during the computation).
+    supports_results_file = False
     
     def __init__(self, video, *args, **kwargs):
         """
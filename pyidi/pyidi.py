@@ -1,76 +1,98 @@
 import os
 import numpy as np
 import collections
-import matplotlib.pyplot as plt
-import pickle
+import functools
 import pyMRAW
 import datetime
 import json
-import glob
-import napari
-from magicgui import magicgui
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 import warnings
 warnings.simplefilter("default")
 
-from .methods import IDIMethod, SimplifiedOpticalFlow, GradientBasedOpticalFlow, LucasKanadeSc, LucasKanade, LucasKanadeSc2
+from .methods import IDIMethod, SimplifiedOpticalFlow, GradientBasedOpticalFlow, LucasKanadeSc, LucasKanade, LucasKanadeSc2, LucasKanadeCUDA, LucasKanadeNB
 from . import tools
 from . import selection
-from . import gui
 
 available_method_shortcuts = [
     ('sof', SimplifiedOpticalFlow),
     ('lk', LucasKanade),
     ('lk_scipy', LucasKanadeSc),
-    ('lk_scipy2', LucasKanadeSc2)
+    ('lk_scipy2', LucasKanadeSc2),
+    ('lk_cuda', LucasKanadeCUDA),
+    ('lk_nb', LucasKanadeNB)
     # ('gb', GradientBasedOpticalFlow)
     ]
 
+available_methods = dict([ 
+    (key, {
+        'IDIMethod': method,
+        'description': method.__doc__,     
+    })
+    for key, method in available_method_shortcuts
+])
+
+_AVAILABLE_METHODS_DOC = '\n' + '\n'.join([
+    f"'{key}' ({method_dict['IDIMethod'].__name__}): {method_dict['description']}"
+    for key, method_dict in available_methods.items()
+    ])
+
+
+@functools.singledispatch
+def _ingest(cih_file, video, load_direct=False):
+    """Load the video into the `video` (pyIDI) object, based on the type of `cih_file`.
+    """
+    raise ValueError('`cih_file` must be either a cih filename or a 3D array (N_time, height, width)')
+
+
+@_ingest.register(str)
+@_ingest.register(os.PathLike)
+def _ingest_cih(cih_file, video, load_direct=False):
+    video.cih_file = os.fspath(cih_file)
+    video.root = os.path.split(video.cih_file)[0]
+    # Load selected video
+    video.mraw, video.info = pyMRAW.load_video(video.cih_file)
+    if load_direct:
+        mraw = video.mraw
+        video.mraw = tools.load_mraw_direct(mraw)
+        if video.mraw is not mraw:
+            mraw._mmap.close()
+    video.N = video.info['Total Frame']
+    video.image_width = video.info['Image Width']
+    video.image_height = video.info['Image Height']
+
+
+@_ingest.register(np.ndarray)
+def _ingest_array(cih_file, video, load_direct=False):
+    video.root = ''
+    video.mraw = cih_file
+    video.cih_file = 'ndarray_video.cih'
+    video.N = cih_file.shape[0]
+    video.image_height = cih_file.shape[1]
+    video.image_width = cih_file.shape[2]
+    video.info = {}
+
 
 class pyIDI:
     """
     The pyIDI base class represents the video to be analysed.
     """
-    def __init__(self, cih_file):
-        
-        if type(cih_file) == str:
-            self.cih_file = cih_file
-            self.root = os.path.split(self.cih_file)[0]
-            # Load selected video
-            self.mraw, self.info = pyMRAW.load_video(self.cih_file)
-            self.N = self.info['Total Frame']
-            self.image_width = self.info['Image Width']
-            self.image_height = self.info['Image Height']
-
-        elif type(cih_file) in [np.ndarray, np.memmap]:
-            self.root = ''
-            self.mraw = cih_file
-            self.cih_file = 'ndarray_video.cih'
-            self.N = cih_file.shape[0]
-            self.image_height = cih_file.shape[1]
-            self.image_width = cih_file.shape[2]
-            self.info = {}
-
-        else:
-            raise ValueError('`cih_file` must be either a cih filename or a 3D array (N_time, height, width)')
-
-        self.available_methods = dict([ 
-            (key, {
-                'IDIMethod': method,
-                'description': method.__doc__,     
-            })
-            for key, method in available_method_shortcuts
-        ])
-
-        # Fill available methods into `set_method` docstring
-        available_methods_doc = '\n' + '\n'.join([
-            f"'{key}' ({method_dict['IDIMethod'].__name__}): {method_dict['description']}"
-            for key, method_dict in self.available_methods.items()
-            ])
-        tools.update_docstring(self.set_method, added_doc=available_methods_doc)  
+    def __init__(self, cih_file, load_direct=False):
+        """
+        :param cih_file: path to the cih file or a 3D array (N_time, height, width)
+        :type cih_file: str or os.PathLike or ndarray
+        :param load_direct: read the whole video into memory with direct I/O
+            (bypassing the page cache) instead of using a memmap. The video must
+            fit into the available memory. Defaults to False
+        :type load_direct: bool, optional
+        """
+        _ingest(cih_file, self, load_direct)
 
+        self.available_methods = available_methods
+        self._repr_cache = None
 
 
-    def set_method(self, method, **kwargs):
+    def set_method(self, method, jit_backend=None, **kwargs):
         """
         Set displacement identification method on video.
         To configure the method, use `method.configure()`
@@ -82,6 +104,9 @@ class pyIDI:
 
         :param method: the method to be used for displacement identification.
         :type method: IDIMethod or str
+        :param jit_backend: if 'numba', the method's compiled functions are used 
+            and compiled at once (only for methods that support it, e.g. 'lk'), defaults to None
+        :type jit_backend: str or None, optional
         """
         if isinstance(method, str) and method in self.available_methods.keys():
             self.method_name = method
@@ -94,6 +119,14 @@ class pyIDI:
                 raise ValueError("The input `method` is not a valid `IDIMethod`.")
         else:
             raise ValueError("method must either be a valid name from `available_methods` or an `IDIMethod`.")
+
+        if jit_backend == 'numba':
+            if hasattr(self.method, '_compile'):
+                self.method._compile()
+            else:
+                warnings.warn(f'The method `{self.method_name}` does not support the numba backend.')
+        elif jit_backend is not None:
+            raise ValueError("jit_backend must be None or 'numba'.")
         
         # Update `get_displacements` docstring
         tools.update_docstring(self.get_displacements, self.method.calculate_displacements)
@@ -122,6 +155,52 @@ class pyIDI:
             self.points = np.asarray(points)
 
 
+    @property
+    def frame0(self):
+        """
+        The first frame of the video (float32), read once and cached for display.
+        """
+        if getattr(self, '_frame0', None) is None:
+            self._frame0 = np.asarray(self.mraw[0], dtype=np.float32)
+        return self._frame0
+
+    @property
+    def preview(self):
+        """
+        The first frame of the video scaled to uint8 (between its 1st and 99th
+        percentile), computed once and cached for display.
+        """
+        if getattr(self, '_preview', None) is None:
+            frame = np.asarray(self.mraw[0])
+            lo, hi = np.percentile(frame, [1, 99])
+            self._preview = tools.to_uint8(frame, lo, hi)
+        return self._preview
+
+    @property
+    def points(self):
+        """
+        Points (number_of_points, 2) in (y, x) image coordinates.
+
+        The array is read-only, to change the points assign a new array
+        (e.g. `video.points = new_points`).
+        """
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        # a read-only copy, so that the coordinate columns below can not go stale
+        self._points = np.array(points)
+        self._points.flags.writeable = False
+        # Contiguous coordinate columns, used by the vectorized display code
+        points_2d = np.reshape(self._points, (-1, 2))
+        self._py = np.ascontiguousarray(points_2d[:, 0], dtype=np.float32)
+        self._px = np.ascontiguousarray(points_2d[:, 1], dtype=np.float32)
+
+    @points.deleter
+    def points(self):
+        del self._points, self._py, self._px
+
+
     def show_points(self, **kwargs):
         """
         Show selected points on image.
@@ -130,13 +209,15 @@ class pyIDI:
         if hasattr(self, 'method') and hasattr(self.method, 'show_points'):
             self.method.show_points(self, **kwargs)
         else:
+            import matplotlib.pyplot as plt
+
             figsize = kwargs.get('figsize', (15, 5))
             cmap = kwargs.get('cmap', 'gray')
             marker = kwargs.get('marker', '.')
             color = kwargs.get('color', 'r')
             fig, ax = plt.subplots(figsize=figsize)
-            ax.imshow(self.mraw[0].astype(float), cmap=cmap)
-            ax.scatter(self.points[:, 1], self.points[:, 0], 
+            ax.imshow(self.preview, cmap=cmap, vmin=0, vmax=255)
+            ax.scatter(self._px, self._py, 
                 marker=marker, color=color)
             plt.grid(False)
             plt.show()
@@ -153,30 +234,58 @@ class pyIDI:
         :param width: width of the arrow, defaults to 0.5
         :param width: float, optional
         """
-        max_L = np.max(field[:, 0]**2 + field[:, 1]**2)
+        import matplotlib.pyplot as plt
+
+        field = np.asarray(field, dtype=np.float32)
+        L = field[:, 0]**2 + field[:, 1]**2
+        with np.errstate(invalid='ignore'):
+            # fmax ignores the NaN of an all-zero field (0/0)
+            alpha = np.fmax(L / np.max(L), 0.2)
+
+        # red arrows, transparency proportional to the squared displacement
+        colors = np.zeros((len(alpha), 4), dtype=np.float32)
+        colors[:, 0] = 1.
+        colors[:, 3] = alpha
 
         fig, ax = plt.subplots(1)
-        ax.imshow(self.mraw[0], 'gray')
-        for i, ind in enumerate(self.points):
-            f0 = field[i, 0]
-            f1 = field[i, 1]
-            alpha = (f0**2 + f1**2) / max_L
-            if alpha < 0.2:
-                alpha = 0.2
-            plt.arrow(ind[1], ind[0], scale*f1, scale*f0, width=width, color='r', alpha=alpha)
+        ax.imshow(self.frame0, 'gray')
+        ax.quiver(self._px, self._py, scale*field[:, 1], scale*field[:, 0], 
+            color=colors, angles='xy', scale_units='xy', scale=1, units='xy', width=width)
 
 
-    def get_displacements(self, autosave=True, **kwargs):
+    def get_displacements(self, autosave=True, parallel_frames=1, **kwargs):
         """
         Calculate the displacements based on chosen method.
 
+        :param autosave: save the results in the analysis directory next to the video 
+            (for methods that support it), defaults to True
+        :type autosave: bool, optional
+        :param parallel_frames: number of processes between which the frames are split
+            (only for methods that support it, e.g. 'sof'), defaults to 1
+        :type parallel_frames: int, optional
+
+        kwargs are passed to the method's `calculate_displacements`.
+
         Method docstring:
         ---
         Method is not set. Please use the `set_method` method.
         ---
         """
         if hasattr(self, 'method'):
-            self.method.calculate_displacements(self, **kwargs)
+            autosave = autosave and getattr(self.method, 'process_number', None) == 0
+            stream_results = autosave and getattr(self.method, 'supports_results_file', False)
+            if stream_results:
+                # the results are written to disk as they are computed
+                self.create_analysis_directory()
+                kwargs['results_file'] = os.path.join(self.root_this_analysis, 'results.npy')
+
+            try:
+                self._calculate_displacements(parallel_frames, **kwargs)
+            except BaseException:
+                # do not leave an incomplete analysis behind
+                if stream_results:
+                    shutil.rmtree(self.root_this_analysis, ignore_errors=True)
+                raise
             self.displacements = self.method.displacements
             
             # auto-save and clearing temp files
@@ -184,8 +293,10 @@ class pyIDI:
                 if self.method.process_number == 0:
                     
                     if autosave:
-                        self.create_analysis_directory()
+                        if not stream_results:
+                            self.create_analysis_directory()
                         self.save(root=self.root_this_analysis)
+                        self.method.displacements = self.displacements
 
                     self.method.clear_temp_files()
                     
@@ -194,13 +305,34 @@ class pyIDI:
             raise ValueError('IDI method has not yet been set. Please call `set_method()` first.')
 
 
+    def _calculate_displacements(self, parallel_frames, **kwargs):
+        """
+        Run the method's displacement computation (in a single process or with the frames
+        split between processes).
+        """
+        if parallel_frames != 1 and getattr(self.method, 'supports_parallel_frames', False) and \
+            self.method_name in self.available_methods and os.path.exists(self.cih_file):
+            postprocess = kwargs.pop('postprocess', True)
+            self.method.displacements = multi_frames(self, parallel_frames, **kwargs)
+            if postprocess:
+                self.method.postprocess()
+        else:
+            if parallel_frames != 1:
+                warnings.warn('The frames can not be processed in parallel for this method or video. Running in a single process.')
+            self.method.calculate_displacements(self, **kwargs)
+
+
     def close_video(self):
         """
         Close the .mraw video memmap.
         """
         if hasattr(self, 'mraw'):
-            self.mraw._mmap.close()
+            if isinstance(self.mraw, np.memmap):
+                self.mraw._mmap.close()
             del self.mraw
+        self._frame0 = None
+        self._preview = None
+        self._repr_cache = None
     
 
     def create_analysis_directory(self):
@@ -212,23 +344,29 @@ class pyIDI:
         if not os.path.exists(self.root_analysis):
             os.mkdir(self.root_analysis)
         
-        analyses = glob.glob(os.path.join(self.root_analysis, 'analysis_*/'))
-        if analyses:
-            last_an = sorted(analyses)[-1]
-            print(last_an, last_an.split('\\')[-2])
-            n = int(last_an.split('\\')[-2].split('_')[-1])
-        else:
-            n = 0
+        # number of the last analysis
+        n = 0
+        for entry in os.scandir(self.root_analysis):
+            if entry.is_dir() and entry.name.startswith('analysis_'):
+                try:
+                    n = max(n, int(entry.name.rsplit('_', 1)[1]))
+                except ValueError:
+                    pass
         self.root_this_analysis = os.path.join(self.root_analysis, f'analysis_{n+1:0>3.0f}')
         
         os.mkdir(self.root_this_analysis)
 
     
     def save(self, root=''):
-        with open(os.path.join(root, 'results.pkl'), 'wb') as f:
-            pickle.dump(self.displacements, f, protocol=-1)
-        with open(os.path.join(root, 'points.pkl'), 'wb') as f:
-            pickle.dump(self.points, f, protocol=-1)
+        results_file = os.path.abspath(os.path.join(root, 'results.npy'))
+        if isinstance(self.displacements, np.memmap) and self.displacements.filename == results_file:
+            # already written during the computation; reopened read-only so that 
+            # the saved analysis is not changed through `self.displacements`
+            self.displacements.flush()
+            self.displacements = np.load(results_file, mmap_mode='r')
+        else:
+            np.save(results_file, self.displacements)
+        np.save(os.path.join(root, 'points.npy'), self.points)
 
         out = {
             'info': self.info,
@@ -243,31 +381,89 @@ class pyIDI:
 
     
     def __repr__(self):
-        
-        rep = 'File name: ' + self.cih_file + ',\n' + \
-        'Image width: ' + str(self.image_width) + ',\n' + \
-        'Image height: ' + str(self.image_height) + ',\n' + \
-        'Total frame: ' + str(self.N) + ',\n' + \
-        'Record Rate(fps): ' + str(self.info['Record Rate(fps)'])
+        # The video part does not change, it is built only once
+        if self._repr_cache is None:
+            self._repr_cache = ',\n'.join([
+                f'File name: {self.cih_file}',
+                f'Image width: {self.image_width}',
+                f'Image height: {self.image_height}',
+                f'Total frame: {self.N}',
+                f"Record Rate(fps): {self.info.get('Record Rate(fps)')}",
+            ])
+        rep = [self._repr_cache]
         
         if hasattr(self, 'method_name'):
-            rep +=',\n' +  'Method: ' + self.method_name
+            rep.append(f'Method: {self.method_name}')
                 
             if hasattr(self.method, 'subset_size'):
-                rep += ',\n' + 'Subset size: ' + str(self.method.subset_size)
+                rep.append(f'Subset size: {self.method.subset_size}')
                 
             elif hasattr(self.method, 'roi_size'):
-                 rep += ',\n' + 'ROI size: ' + str(self.method.roi_size)
+                rep.append(f'ROI size: {self.method.roi_size}')
 
+            if getattr(self.method, 'use_numba', False):
+                rep.append('Numba: enabled')
         
         if hasattr(self, 'points'):
-             rep +=',\n' + 'Number of points: ' + str(len(self.points))
+            rep.append(f'Number of points: {len(self.points)}')
 
-        return rep
+        return ',\n'.join(rep)
     
     def gui(self):
+        # napari is imported only when the GUI is used
+        from . import gui
         self.gui_obj = gui.gui(self)
 
+
+# Fill available methods into `set_method` docstring
+tools.update_docstring(pyIDI.set_method, added_doc=_AVAILABLE_METHODS_DOC)
+
+
+def multi_frames(video, processes, **kwargs):
+    """
+    Splitting the frames to multiple processes and creating a
+    pool of workers.
+    
+    :param video: the video object with defined attributes
+    :type video: object
+    :param processes: number of processes
+    :type processes: int
+    :param kwargs: passed to the method's `calculate_displacements` in every process
+    :return: displacements
+    :rtype: ndarray
+    """
+    if processes < 1:
+        raise ValueError('Number of processes must be positive.')
+
+    start, stop = video.method.frame_range
+    bounds = np.linspace(start, stop, processes+1).astype(int)
+    settings = video.method.create_settings_dict()
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(frames_worker, video.cih_file, video.method_name, settings, video.points, (a, b), kwargs)
+            for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        results = [f.result() for f in futures]
+
+    displacements = np.zeros((video.points.shape[0], video.N, 2))
+    if results:
+        out = np.concatenate(results, axis=1)
+        displacements[:, :out.shape[1]] = out
+    return displacements
+
+
+def frames_worker(cih_file, method_name, settings, points, frame_range, kwargs):
+    """
+    A function that is called for each job in `multi_frames`.
+    """
+    settings = dict(settings, mraw_range=frame_range, progress_bar=False)
+    _video = pyIDI(cih_file)
+    _video.set_method(method_name, **settings)
+    _video.set_points(points)
+    # the parts are postprocessed together in the main process
+    _video.method.calculate_displacements(_video, **dict(kwargs, postprocess=False))
+
+    return _video.method.displacements[:, :frame_range[1]-frame_range[0]]
+
 #     def gui(self):
 #         """Napari interface.
 #         """
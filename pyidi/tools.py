@@ -1,6 +1,13 @@
+import os
+import errno
+import functools
+import mmap
+import warnings
+from psutil import virtual_memory
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.collections import PolyCollection
 
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
@@ -262,12 +269,36 @@ def inside_polygon(x, y, points):
     return inside
 
 
+def roi_collection(points, roi_size, offset=0., **kwargs):
+    """
+    Borders of the regions of interest as a single matplotlib collection
+    (instead of one `Rectangle` patch per point).
+
+    :param points: centers of the regions of interest (n_points, 2)
+    :type points: numpy array
+    :param roi_size: size of the region of interest (h, w)
+    :type roi_size: array-like of size 2
+    :param offset: shift of the borders in px, defaults to 0.
+    :type offset: float, optional
+    :return: `PolyCollection` to be added with `ax.add_collection`.
+        kwargs are passed to the `PolyCollection`.
+    """
+    h, w = roi_size
+    corner = np.asarray(points, dtype=float) - np.asarray(roi_size)//2 + offset
+    y0, x0 = corner[:, 0], corner[:, 1]
+
+    vertices = np.empty((len(corner), 4, 2))
+    vertices[:, :, 0] = x0[:, np.newaxis] + np.array([0, w, w, 0])
+    vertices[:, :, 1] = y0[:, np.newaxis] + np.array([0, 0, h, h])
+    return PolyCollection(vertices, **kwargs)
+
+
 def update_docstring(target_method, doc_method=None, delimiter='---', added_doc=''):
     """
     Update the docstring in target_method with the docstring from doc_method.
     
     :param target_method: The method that waits for the docstring
-    :type target_method: method
+    :type target_method: method or function
     :param doc_method: The method that holds the desired docstring
     :type doc_method: method
     :param delimiter: insert the desired docstring between two delimiters, defaults to '---'
@@ -286,7 +317,112 @@ def update_docstring(target_method, doc_method=None, delimiter='---', added_doc=
     else:
         docstring[1] = added_doc.replace('\n', '\n' + ' '*leading_spaces)
 
-    target_method.__func__.__doc__ = delimiter.join(docstring)
+    getattr(target_method, '__func__', target_method).__doc__ = delimiter.join(docstring)
+
+
+class FramePrefetcher:
+    """
+    Read-ahead access to the video frames.
+
+    When frame `k` is accessed, the operating system is advised (`madvise(MADV_WILLNEED)`)
+    to read the next `lookahead` frames of the memmap in the background, so that
+    the reading overlaps with the computation. For arrays that are not memmaps
+    or on systems without `madvise`, the frames are only returned.
+    """
+    def __init__(self, mraw, lookahead=8):
+        """
+        :param mraw: video (N_time, height, width)
+        :type mraw: numpy.memmap or numpy.ndarray
+        :param lookahead: number of frames to read ahead, defaults to 8
+        :type lookahead: int, optional
+        """
+        self.mraw = mraw
+        self.lookahead = lookahead
+        self.stride = mraw.strides[0]
+        self._mmap = None
+
+        mm = getattr(mraw, '_mmap', None)
+        if mm is not None and hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_WILLNEED') \
+                and mraw.flags.c_contiguous:
+            # The memmap array starts `offset % ALLOCATIONGRANULARITY` bytes into the mmap
+            root = mraw
+            while isinstance(root.base, np.ndarray):
+                root = root.base
+            mm_start = root.ctypes.data - getattr(root, 'offset', 0) % mmap.ALLOCATIONGRANULARITY
+            self._start = mraw.ctypes.data - mm_start
+            self._mmap = mm
+
+    def __len__(self):
+        return self.mraw.shape[0]
+
+    def __getitem__(self, k):
+        self.prefetch(k + 1)
+        return self.mraw[k]
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def prefetch(self, k, lookahead=None):
+        """Advise the OS to read the frames `k` to `k + lookahead`.
+
+        :param k: index of the first frame
+        :type k: int
+        :param lookahead: number of frames, defaults to `self.lookahead`
+        :type lookahead: int, optional
+        """
+        if self._mmap is None or k >= len(self):
+            return
+        if lookahead is None:
+            lookahead = self.lookahead
+
+        start = self._start + k * self.stride
+        stop = min(start + lookahead * self.stride, len(self._mmap))
+        aligned_start = start - start % mmap.PAGESIZE
+        try:
+            self._mmap.madvise(mmap.MADV_WILLNEED, aligned_start, stop - aligned_start)
+        except (OSError, ValueError):
+            # Read-ahead is only an optimization
+            self._mmap = None
+
+
+@functools.lru_cache(maxsize=16)
+def _u16_to_u8_lut(lo, hi):
+    """Lookup table that maps the uint16 values from [lo, hi] to uint8 [0, 255].
+    """
+    values = np.arange(2**16, dtype=np.float64)
+    return np.clip((values - lo) * 255. / max(hi - lo, 1), 0, 255).astype(np.uint8)
+
+
+def to_uint8(image, lo, hi):
+    """Scale the image intensities from [lo, hi] to uint8 [0, 255] for display.
+
+    The uint8 and uint16 images are converted with a cached lookup table,
+    other images with a compiled function in a single pass.
+    
+    :param image: 2d numpy array
+    :param lo: intensity that is mapped to 0
+    :type lo: float
+    :param hi: intensity that is mapped to 255
+    :type hi: float
+    :return: uint8 image
+    """
+    if image.dtype in (np.uint8, np.uint16):
+        return _u16_to_u8_lut(int(np.floor(lo)), int(np.ceil(hi)))[image]
+    
+    out = np.empty(image.shape, dtype=np.uint8)
+    _normalize_u8(np.ascontiguousarray(image), float(lo), float(hi), out)
+    return out
+
+
+@nb.njit(parallel=True, cache=True)
+def _normalize_u8(image, lo, hi, out):
+    """Scale [lo, hi] to uint8 [0, 255] and clip in a single pass over the image.
+    """
+    span = max(hi - lo, 1e-12)
+    for i in nb.prange(image.shape[0]):
+        for j in range(image.shape[1]):
+            out[i, j] = np.uint8(min(max((image[i, j] - lo) * 255. / span, 0.), 255.))
 
 
 def split_points(points, processes):
@@ -337,7 +473,61 @@ def get_gradient(image):
     return Gx[1:-1], Gy[:, 1:-1]
 
 
+def load_mraw_direct(mraw, chunk_size=16*2**20, alignment=4096):
+    """Read the whole video memmap into memory, bypassing the page cache.
+
+    The file is opened with `O_DIRECT` and read in large chunks directly
+    into a page-aligned array. This avoids the page faults of the first
+    pass over a memmap. The whole video is held in memory (a warning is
+    issued if it is larger than the available memory). If `O_DIRECT` is not supported (e.g. tmpfs, NFS,
+    Windows), the input memmap is returned unchanged.
+
+    :param mraw: video memmap, as returned by `pyMRAW.load_video`
+    :type mraw: numpy.memmap
+    :param chunk_size: size of a single read in bytes, defaults to 16 MB
+    :type chunk_size: int, optional
+    :param alignment: alignment of buffer, offset and read size, defaults to 4096
+    :type alignment: int, optional
+    :return: video array (N_time, height, width)
+    :rtype: numpy.ndarray or numpy.memmap
+    """
+    if not isinstance(mraw, np.memmap) or not hasattr(os, 'O_DIRECT'):
+        return mraw
+    if not mraw.flags.c_contiguous or mraw.offset % alignment:
+        return mraw
+
+    nbytes = mraw.nbytes
+    if nbytes > virtual_memory().available:
+        warnings.warn(f'The video ({nbytes/2**30:.1f} GB) is larger than the available memory.')
+    nbytes_aligned = -(-nbytes // alignment) * alignment
+    chunk_size = max(chunk_size // alignment, 1) * alignment
+
+    # Page-aligned slab (numpy does not guarantee the alignment O_DIRECT requires)
+    buffer = np.empty(nbytes_aligned + alignment, dtype=np.uint8)
+    start = -buffer.ctypes.data % alignment
+    slab = buffer[start:start+nbytes_aligned]
+    view = memoryview(slab)
+
+    try:
+        fd = os.open(mraw.filename, os.O_RDONLY | os.O_DIRECT)
+    except OSError as e:
+        if e.errno == errno.EINVAL:
+            return mraw
+        raise
+
+    try:
+        read = 0
+        while read < nbytes:
+            n = os.preadv(fd, [view[read:read+chunk_size]], mraw.offset + read)
+            if n == 0:
+                raise EOFError(f'Unexpected end of file: {mraw.filename}')
+            read += n
+    except OSError as e:
+        if e.errno == errno.EINVAL:
+            return mraw
+        raise
+    finally:
+        os.close(fd)
+
+    return slab[:nbytes].view(mraw.dtype).reshape(mraw.shape)
 
-    
-                
-        
\ No newline at end of file
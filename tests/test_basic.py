@@ -1,5 +1,10 @@
 import numpy as np
 import sys, os
+import errno
+import mmap
+import pytest
+from numpy.testing import assert_array_equal, assert_allclose
+import matplotlib.patches as patches
 my_path = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, my_path + '/../')
 
@@ -21,6 +26,53 @@ def test_points_1():
     video.set_method(method='sof')
     video.set_points(points=[(0, 1), (1, 1)])
 
+def test_points_read_only():
+    video = pyidi.pyIDI(cih_file='./data/data_showcase.cih')
+    points = np.array([(0, 1), (1, 1)])
+    video.set_points(points=points)
+
+    points[0] = (5, 5)
+    assert_array_equal(video.points, [(0, 1), (1, 1)])
+    with pytest.raises(ValueError):
+        video.points[0] = (5, 5)
+
+    video.points = points
+    assert_array_equal(video._py, points[:, 0])
+    assert_array_equal(video._px, points[:, 1])
+
+def test_to_uint8():
+    rng = np.random.default_rng(0)
+    image = rng.uniform(-10, 300, size=(40, 30))
+    lo, hi = 12.3, 250.7
+    expected = np.clip((image - lo)*255/(hi - lo), 0, 255).astype(np.uint8)
+    assert_array_equal(pyidi.tools.to_uint8(image, lo, hi), expected)
+
+    # the uint16 lookup table gives the same result for integer bounds
+    image = rng.integers(0, 4000, size=(40, 30)).astype(np.uint16)
+    lo, hi = 100, 3000
+    expected = np.clip((image.astype(float) - lo)*255/(hi - lo), 0, 255).astype(np.uint8)
+    assert_array_equal(pyidi.tools.to_uint8(image, lo, hi), expected)
+    assert_array_equal(pyidi.tools.to_uint8(image.astype(float), lo, hi), expected)
+
+@pytest.mark.skipif(not hasattr(mmap, 'MADV_WILLNEED'), reason='madvise is not available')
+def test_frame_prefetcher():
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+
+    for mraw in [video.mraw, video.mraw[3:10]]:
+        prefetcher = pyidi.tools.FramePrefetcher(mraw, lookahead=2)
+        assert prefetcher._mmap is not None
+
+        # start address of the mmap, from the mmap buffer itself
+        mm_buffer = np.frombuffer(mraw._mmap, dtype=np.uint8)
+        mm_start = mm_buffer.ctypes.data
+        del mm_buffer
+        assert prefetcher._start == mraw.ctypes.data - mm_start
+
+        frames = list(prefetcher)
+        assert len(frames) == len(mraw)
+        assert_array_equal(np.array(frames), mraw)
+        assert prefetcher._mmap is not None
+
 def test_info():
     video = pyidi.pyIDI(cih_file='./data/data_showcase.cih')
     assert 'Shutter Speed(s)' in video.info.keys()
@@ -28,6 +80,36 @@ def test_info():
     assert 'Total Frame' in video.info.keys()
     assert 'Record Rate(fps)' in video.info.keys()
 
+def test_load_direct():
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+    video_direct = pyidi.pyIDI(cih_file='./data/data_synthetic.cih', load_direct=True)
+    assert video_direct.mraw.shape == video.mraw.shape
+    assert video_direct.mraw.dtype == video.mraw.dtype
+    assert_array_equal(video_direct.mraw, video.mraw)
+
+def test_load_direct_fallback(monkeypatch):
+    def os_open(*args, **kwargs):
+        raise OSError(errno.EINVAL, 'Invalid argument')
+    monkeypatch.setattr(pyidi.tools.os, 'open', os_open)
+
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih', load_direct=True)
+    assert isinstance(video.mraw, np.memmap)
+    video_memmap = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+    assert_array_equal(video.mraw, video_memmap.mraw)
+
+def test_roi_collection():
+    points = np.array([[10, 20], [15.5, 7], [3, 40]])
+    roi_size = np.array([5, 9])
+
+    for offset in [0., -0.5]:
+        collection = pyidi.tools.roi_collection(points, roi_size, offset=offset)
+        paths = collection.get_paths()
+        assert len(paths) == len(points)
+
+        for point, path in zip(points, paths):
+            rectangle = patches.Rectangle((point - roi_size//2 + offset)[::-1], roi_size[1], roi_size[0])
+            assert_allclose(path.vertices[:4], rectangle.get_verts()[:4])
+
 
 if __name__ == '__main__':
     test_info()
@@ -1,6 +1,9 @@
 import numpy as np
-from numpy.testing import assert_array_equal
+from numpy.testing import assert_array_equal, assert_allclose
 import sys, os
+import shutil
+import pickle
+import pytest
 my_path = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, my_path + '/../')
 
@@ -23,4 +26,110 @@ def test_multiprocessing():
     video.method.configure(pbar_type='atpbar', multi_type='mantichora')
     res_2 = video.get_displacements(processes=2, resume_analysis=False, autosave=False)
 
-    assert_array_equal(res_1, res_2)
\ No newline at end of file
+    assert_array_equal(res_1, res_2)
+
+def test_parallel_frames():
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+    video.set_method(method='sof', progress_bar=False)
+
+    points = np.array([
+        [ 31,  35],
+        [ 31, 215],
+        [ 31, 126],
+        [ 95,  71],
+    ])
+    video.set_points(points)
+    res_1 = video.get_displacements()
+    res_2 = video.get_displacements(parallel_frames=2)
+
+    assert_array_equal(res_1, res_2)
+
+@pytest.mark.parametrize('mraw_range', [(0, 10**6), (0, -1), (5, 2)])
+def test_parallel_frames_mraw_range(mraw_range):
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+    video.set_method(method='sof', progress_bar=False, mraw_range=mraw_range)
+
+    points = np.array([
+        [ 31,  35],
+        [ 95,  71],
+    ])
+    video.set_points(points)
+    res_1 = video.get_displacements(autosave=False)
+    res_2 = video.get_displacements(autosave=False, parallel_frames=2)
+    res_3 = video.get_displacements(autosave=False, parallel_frames=2, postprocess=False)
+
+    assert_array_equal(res_1, res_2)
+    assert res_3.shape == res_1.shape
+
+def test_numba():
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+    points = np.array([
+        [ 31,  35],
+        [ 95,  71],
+    ])
+    video.set_points(points)
+
+    video.set_method(method='lk', int_order=1, roi_size=(9, 9), show_pbar=False)
+    res_1 = video.get_displacements(resume_analysis=False, autosave=False)
+
+    video.set_method(method='lk', jit_backend='numba', int_order=1, roi_size=(9, 9), show_pbar=False)
+    res_2 = video.get_displacements(resume_analysis=False, autosave=False)
+
+    assert_allclose(res_1, res_2, atol=1e-6)
+
+def test_lk_cuda_fallback():
+    if pyidi.methods._lucas_kanade_cuda.cuda_available():
+        pytest.skip('CUDA is available, the CPU fallback is not used.')
+
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+    points = np.array([
+        [ 31,  35],
+        [ 95,  71],
+    ])
+    video.set_points(points)
+
+    video.set_method(method='lk', int_order=1, roi_size=(9, 9), show_pbar=False)
+    res_1 = video.get_displacements(resume_analysis=False, autosave=False)
+
+    video.set_method(method='lk_cuda', int_order=1, roi_size=(9, 9), show_pbar=False)
+    with pytest.warns(UserWarning, match='CUDA'):
+        res_2 = video.get_displacements(resume_analysis=False, autosave=False)
+
+    assert_array_equal(res_1, res_2)
+
+
+def test_load_analysis(tmp_path):
+    video = pyidi.pyIDI(cih_file='./data/data_synthetic.cih')
+    points = np.array([
+        [ 31,  35],
+        [ 95,  71],
+    ])
+    video.set_points(points)
+    video.set_method(method='lk', int_order=1, roi_size=(9, 9), show_pbar=False)
+    res = np.array(video.get_displacements(resume_analysis=False, autosave=True))
+    analysis_path = video.root_this_analysis
+
+    try:
+        # .npy analysis
+        video_loaded, settings = pyidi.load_analysis(analysis_path)
+        assert_array_equal(video_loaded.displacements, res)
+        assert_array_equal(video_loaded.points, points)
+        assert settings['roi_size'] == [9, 9]
+
+        # legacy .pkl analysis
+        legacy_path = str(tmp_path / 'analysis_legacy')
+        shutil.copytree(analysis_path, legacy_path)
+        for name in ['points', 'results']:
+            filename = os.path.join(legacy_path, name)
+            with open(filename + '.pkl', 'wb') as f:
+                pickle.dump(np.load(filename + '.npy'), f, protocol=-1)
+            os.remove(filename + '.npy')
+
+        video_loaded, settings = pyidi.load_analysis(legacy_path)
+        assert_array_equal(video_loaded.displacements, res)
+        assert_array_equal(video_loaded.points, points)
+
+    finally:
+        shutil.rmtree(analysis_path)
+        if not os.listdir(video.root_analysis):
+            os.rmdir(video.root_analysis)